@@ -1,35 +1,56 @@
 # backend/app/api/deps.py
+import hashlib
+import logging
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import firebase_admin
-from firebase_admin import auth, credentials
-from app.core.config import settings # Assuming settings.py contains Firebase config
+from app.core.config import Settings, get_settings
+from app.core.firebase_verify import ExpiredIdTokenError, InvalidIdTokenError, verify_token
 from app.schemas.user import User # Pydantic model for User
+from app.core.cache import TTLCache
 
-# Initialize Firebase Admin SDK if not already initialized
-# This should ideally happen once at application startup in main.py
-# For deps.py, we ensure it's configured.
-if not firebase_admin._apps:
-    # Check if FIREBASE_CREDENTIALS_PATH is set, otherwise expect GOOGLE_APPLICATION_CREDENTIALS env var
-    if settings.FIREBASE_CREDENTIALS_PATH:
-        cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-    else:
-        # If no specific path, Firebase Admin SDK will try to use GOOGLE_APPLICATION_CREDENTIALS
-        # or attempt to find credentials in a standard location.
-        # For Railway/Render, service account JSON might be set via env var directly.
-        # For now, let's assume it's handled or will be handled during deployment setup.
-        cred = credentials.ApplicationDefault()
-    firebase_admin.initialize_app(cred)
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token") # Placeholder, actual token URL might differ
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+# Verified ID tokens are cached by SHA-256 of the raw token so the RSA signature check
+# only runs on a cache miss. Once a token has been verified only its `exp` needs re-checking.
+TOKEN_EXPIRY_SKEW_SECONDS = 5
+_token_cache = TTLCache(max_size=10_000)
+
+# User records change rarely, so they are cached by UID to keep the (future) Firestore read
+# off the steady-state request path. Call invalidate_cached_user() after updating a user.
+_user_cache = TTLCache(max_size=10_000)
+
+async def _get_user(uid: str, email: str, settings: Settings) -> User:
+    user = _user_cache.get(uid)
+    if user is None:
+        # Here, you could fetch the user from your database if you store more user info
+        # user_data_from_db = await get_user_from_db(uid)
+        # user = User(**user_data_from_db.dict())
+        user = User(id=uid, email=email) # Assuming User Pydantic model has id and email
+        _user_cache.set(uid, user, time.time() + settings.USER_CACHE_TTL_SECONDS)
+    return user
+
+def invalidate_cached_user(uid: str) -> None:
+    """Drops the cached record for uid so the next request reloads it."""
+    _user_cache.pop(uid)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    settings: Settings = Depends(get_settings)
+) -> User:
     """
     Dependency to get the current user from a Firebase ID token.
     The token is expected to be passed in the Authorization header as a Bearer token.
     """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    decoded_token = _token_cache.get(cache_key, skew=TOKEN_EXPIRY_SKEW_SECONDS)
+    if decoded_token is not None:
+        return await _get_user(decoded_token["uid"], decoded_token["email"], settings)
+
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await verify_token(token, settings.FIREBASE_PROJECT_ID, settings.JWKS_CACHE_PATH)
         uid = decoded_token.get("uid")
         email = decoded_token.get("email")
         # You might want to fetch more user details from your Firestore user collection
@@ -40,40 +61,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
                 detail="Invalid authentication credentials (missing UID or email)",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        # Here, you could fetch the user from your database if you store more user info
-        # user_data_from_db = await get_user_from_db(uid) 
-        # return User(**user_data_from_db.dict())
-        return User(id=uid, email=email) # Assuming User Pydantic model has id and email
-    except firebase_admin.auth.ExpiredIdTokenError:
+        expires_at = min(decoded_token["exp"], time.time() + settings.TOKEN_CACHE_MAX_TTL_SECONDS)
+        _token_cache.set(cache_key, decoded_token, expires_at)
+        return await _get_user(uid, email, settings)
+    except ExpiredIdTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except firebase_admin.auth.InvalidIdTokenError:
+    except InvalidIdTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials (invalid token)",
             headers={"WWW-Authenticate": "Bearer"},
         )
     except Exception as e:
-        # Catch any other Firebase Admin SDK errors or issues
-        print(f"Error during token verification: {e}") # Log this for server-side debugging
+        # Catch any other verification errors (e.g. JWKS fetch failures)
+        logger.exception("Error during token verification") # Log this for server-side debugging
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not validate credentials due to an internal error.",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
-    """
-    Dependency to get the current active user.
-    This can be expanded to check if the user is active (e.g., not disabled).
-    For now, it just returns the user obtained from get_current_user.
-    """
-    # if not current_user.is_active: # Assuming User model has an is_active field
-    #     raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+# Endpoints depend on get_current_active_user. It is an alias rather than a wrapper so FastAPI
+# resolves a single dependency node per request. If an is_active check is ever needed,
+# add it to get_current_user itself.
+get_current_active_user = get_current_user
 
 # You might add more dependencies here, e.g., for checking roles/permissions
 # async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
@@ -1,6 +1,7 @@
 # backend/app/api/v1/endpoints/ai_suggestions.py
+import logging
 from fastapi import APIRouter, HTTPException, Depends, Body
-from typing import Any, List, Dict
+from typing import Any
 from pydantic import BaseModel
 
 # Assuming your service layer will handle the actual AI logic
@@ -9,15 +10,18 @@ from app.api.deps import get_current_active_user # Import the actual dependency
 from app.schemas.user import User # Import the User schema
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Placeholder for ProjectData model (Pydantic model)
 # This would define the structure of MIDI, audio (features), and lyrics data sent from frontend
 # For a real application, this should be defined in a schemas file e.g., app.schemas.project
+# The nested payloads are passed through untouched, so they are typed as bare list/dict:
+# pydantic then only checks the container type instead of walking every note and key.
 class ProjectDataContext(BaseModel):
-    midi_data: List[Dict[str, Any]] # e.g., list of notes like in VoiceToMidi
-    audio_features: Dict[str, Any] # e.g., key, tempo, energy extracted from audio
+    midi_data: list # e.g., list of notes like in VoiceToMidi
+    audio_features: dict # e.g., key, tempo, energy extracted from audio
     lyrics: str # Current lyrics
-    user_preferences: Dict[str, Any] # e.g., desired mood, complexity
+    user_preferences: dict # e.g., desired mood, complexity
 
 @router.post("/analyze-style/", summary="Analyze project context to update user style profile")
 async def analyze_style(
@@ -32,7 +36,7 @@ async def analyze_style(
     - Requires authentication.
     """
     user_id = current_user.id
-    print(f"Analyzing style for user {user_id} based on project data.")
+    logger.debug("Analyzing style for user %s based on project data.", user_id)
     # In a real implementation:
     # style_profile_summary = await analyze_project_style(user_id, project_data)
     
@@ -97,6 +101,3 @@ async def suggest_lyrics(
         "message": "Lyric suggestions generated (placeholder)."
     }
 
-# Need to import BaseModel for ProjectDataContext
-from pydantic import BaseModel
-
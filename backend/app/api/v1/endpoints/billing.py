@@ -1,23 +1,27 @@
 # backend/app/api/v1/endpoints/billing.py
+import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, Body
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Dict
+import stripe
 
 from app.api.deps import get_current_active_user
+from app.core.config import Settings, get_settings
 from app.schemas.user import User
-from app.schemas.subscription import SubscriptionCreate, Subscription, StripeWebhookEvent # Assuming these are defined
+from app.schemas.subscription import SubscriptionCreate, Subscription # Assuming these are defined
 
-# In a real app, you would import and use the Stripe library
-# import stripe
-# from app.core.config import settings
+# Checkout session creation will also need the API key:
 # stripe.api_key = settings.STRIPE_SECRET_KEY
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Placeholder for a list of available plans (could be fetched from DB or config)
-PLANS = {
+# Read-only view so request handlers can't mutate the shared plan table
+PLANS = MappingProxyType({
     "free": {"name": "Free Tier", "price": 0, "features": ["Basic voice-to-MIDI", "Limited sample uploads"]},
     "premium_monthly": {"name": "Premium Monthly", "price": 1500, "stripe_price_id": "price_xxxxxxxxxxxxxx", "features": ["Unlimited voice-to-MIDI", "Unlimited sample uploads", "Collaboration mode"]}
-}
+})
 
 @router.post("/create-checkout-session/", response_model=dict, summary="Create a Stripe Checkout Session for Subscription")
 async def create_checkout_session(
@@ -30,10 +34,10 @@ async def create_checkout_session(
     - Requires authentication.
     """
     user_id = current_user.id
-    if plan_id not in PLANS or plan_id == "free":
+    selected_plan = PLANS.get(plan_id)
+    if selected_plan is None or plan_id == "free":
         raise HTTPException(status_code=400, detail="Invalid or free plan ID for checkout.")
 
-    selected_plan = PLANS[plan_id]
     stripe_price_id = selected_plan.get("stripe_price_id")
 
     if not stripe_price_id:
@@ -62,7 +66,7 @@ async def create_checkout_session(
     #     raise HTTPException(status_code=500, detail=str(e))
 
     # Placeholder response for prototype
-    print(f"User {user_id} attempting to create checkout session for plan {plan_id} (Stripe Price ID: {stripe_price_id})")
+    logger.debug("User %s attempting to create checkout session for plan %s (Stripe Price ID: %s)", user_id, plan_id, stripe_price_id)
     return {
         "sessionId": f"cs_test_placeholder_{user_id}_{plan_id}",
         "message": "Stripe Checkout session created (placeholder). Integrate with Stripe SDK on frontend.",
@@ -80,7 +84,7 @@ async def get_subscription_status(
     user_id = current_user.id
     # In a real app, fetch this from your database where you store subscription info
     # For prototype, return a placeholder or a default free plan status
-    print(f"Fetching subscription status for user {user_id}")
+    logger.debug("Fetching subscription status for user %s", user_id)
     # Example: Default to free plan if no subscription found
     return Subscription(
         id=f"sub_placeholder_{user_id}",
@@ -93,57 +97,60 @@ async def get_subscription_status(
         stripe_customer_id=None
     )
 
+async def _handle_checkout_completed(session: Dict[str, Any]) -> None:
+    user_id = session.get("client_reference_id")
+    stripe_customer_id = session.get("customer")
+    stripe_subscription_id = session.get("subscription")
+    # Here, you would update your database: create/update user subscription record
+    logger.info("Checkout session completed for user %s. Customer: %s, Subscription: %s", user_id, stripe_customer_id, stripe_subscription_id)
+    # Mark subscription as active, store stripe IDs, set plan details.
+
+async def _handle_invoice_payment_succeeded(invoice: Dict[str, Any]) -> None:
+    stripe_subscription_id = invoice.get("subscription")
+    # Update subscription period, ensure it's active.
+    logger.info("Invoice payment succeeded for subscription %s.", stripe_subscription_id)
+
+async def _handle_subscription_changed(subscription_data: Dict[str, Any]) -> None:
+    stripe_subscription_id = subscription_data.get("id")
+    new_status = subscription_data.get("status") # e.g., active, canceled, past_due
+    # Update subscription status in your database.
+    logger.info("Subscription %s status updated to %s.", stripe_subscription_id, new_status)
+
+# Event type -> handler. Add more event handlers as needed.
+_WEBHOOK_HANDLERS = {
+    "checkout.session.completed": _handle_checkout_completed,
+    "invoice.payment_succeeded": _handle_invoice_payment_succeeded,
+    "customer.subscription.updated": _handle_subscription_changed,
+    "customer.subscription.deleted": _handle_subscription_changed,
+    "customer.subscription.trial_will_end": _handle_subscription_changed,
+}
+
 @router.post("/stripe-webhook/", summary="Handle Stripe Webhook Events")
-async def stripe_webhook(
-    request: Request, 
-    event_payload: StripeWebhookEvent = Body(...)
-):
+async def stripe_webhook(request: Request, settings: Settings = Depends(get_settings)):
     """
     Handles incoming webhook events from Stripe to update subscription statuses, etc.
-    This endpoint should be protected by verifying the Stripe signature (not implemented in placeholder).
+    The raw body is read once, its Stripe signature is verified, and only then is it parsed.
     """
-    # In a real implementation:
-    # endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
-    # sig_header = request.headers.get("stripe-signature")
-    # try:
-    #     event = stripe.Webhook.construct_event(
-    #         payload=await request.body(), sig_header=sig_header, secret=endpoint_secret
-    #     )
-    # except ValueError as e: # Invalid payload
-    #     raise HTTPException(status_code=400, detail=str(e))
-    # except stripe.error.SignatureVerificationError as e: # Invalid signature
-    #     raise HTTPException(status_code=400, detail=str(e))
-
-    event_type = event_payload.type
-    data_object = event_payload.data.get("object", {})
-
-    print(f"Received Stripe webhook event: {event_type}")
-    # print(f"Data: {data_object}")
-
-    # Handle specific event types
-    if event_type == "checkout.session.completed":
-        session = data_object
-        user_id = session.get("client_reference_id")
-        stripe_customer_id = session.get("customer")
-        stripe_subscription_id = session.get("subscription")
-        # Here, you would update your database: create/update user subscription record
-        print(f"Checkout session completed for user {user_id}. Customer: {stripe_customer_id}, Subscription: {stripe_subscription_id}")
-        # Mark subscription as active, store stripe IDs, set plan details.
-    
-    elif event_type == "invoice.payment_succeeded":
-        invoice = data_object
-        stripe_subscription_id = invoice.get("subscription")
-        # Update subscription period, ensure it's active.
-        print(f"Invoice payment succeeded for subscription {stripe_subscription_id}.")
-
-    elif event_type == "customer.subscription.updated" or event_type == "customer.subscription.deleted" or event_type == "customer.subscription.trial_will_end":
-        subscription_data = data_object
-        stripe_subscription_id = subscription_data.get("id")
-        new_status = subscription_data.get("status") # e.g., active, canceled, past_due
-        # Update subscription status in your database.
-        print(f"Subscription {stripe_subscription_id} status updated to {new_status}.")
-
-    # Add more event handlers as needed
+    sig_header = request.headers.get("stripe-signature")
+    if not sig_header:
+        raise HTTPException(status_code=400, detail="Missing Stripe-Signature header.")
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=500, detail="Stripe webhook secret is not configured.")
+
+    payload = await request.body()
+    try:
+        event = stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+    except ValueError as e: # Invalid payload
+        raise HTTPException(status_code=400, detail=str(e))
+    except stripe.SignatureVerificationError as e: # Invalid signature
+        raise HTTPException(status_code=400, detail=str(e))
+
+    event_type = event.type
+    logger.debug("Received Stripe webhook event: %s", event_type)
+    handler = _WEBHOOK_HANDLERS.get(event_type)
+    if handler is not None:
+        # StripeObject is no longer a dict subclass in current stripe releases, so handlers get a plain dict
+        await handler(event.data.object.to_dict())
 
     return {"status": "webhook_received_placeholder", "event_type": event_type}
 
@@ -1,18 +1,56 @@
 # backend/app/api/v1/endpoints/exports.py
 from fastapi import APIRouter, HTTPException, Depends, Body
-from fastapi.responses import FileResponse # For sending files
+from fastapi.responses import FileResponse, Response # For sending files
 from typing import Any, List, Dict
+from urllib.parse import quote
+import asyncio
+import io
+import logging
+import operator
 import os
+import stat
+import time
+from pathlib import Path
+import aiofiles
 import mido # For MIDI file creation
+import numpy as np
 from pydantic import BaseModel # Import BaseModel
 
 from app.api.deps import get_current_active_user # Import the actual dependency
+from app.core.cache import TTLCache
+from app.core.config import Settings, get_settings
 from app.schemas.user import User # Import the User schema
 
 # For WAV export, a more complex library like librosa/soundfile or even a headless DAW/synth might be needed.
 # For MVP, we might simulate WAV export or use a very simple synth.
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+_MEDIA_TYPES = {".mid": "audio/midi", ".midi": "audio/midi", ".wav": "audio/wav"}
+
+class ExportFileResponse(FileResponse):
+    # WAV stems can be large; read them in 1MB chunks instead of Starlette's 64KB default
+    chunk_size = 1024 * 1024
+
+# Generated MIDI files are small, so they're kept only in memory keyed by (user_id, filename) and
+# served straight from here instead of round-tripping through disk. EXPORT_CACHE_TTL_SECONDS is the
+# download window, and the cache is per-process: the download must reach the same worker before the
+# TTL passes or a restart (the Procfile runs a single uvicorn worker). If the API is ever run with
+# multiple workers, move this to a shared store (e.g. Redis with the same TTL).
+_midi_export_cache = TTLCache(max_size=1_000)
+
+def _encode_midi(mid: mido.MidiFile) -> bytes:
+    midi_buffer = io.BytesIO()
+    mid.save(file=midi_buffer)
+    return midi_buffer.getvalue()
+
+def _attachment_headers(filename: str) -> Dict[str, str]:
+    # Same Content-Disposition encoding FileResponse uses for non-ASCII filenames
+    quoted = quote(filename)
+    if quoted != filename:
+        return {"Content-Disposition": f"attachment; filename*=utf-8''{quoted}"}
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
 
 # Placeholder for ProjectData model (Pydantic model)
 # This would define the structure of MIDI, lyrics, and potentially sample usage data
@@ -25,13 +63,64 @@ class ProjectExportData(BaseModel): # Inherit from BaseModel
     # sample_assignments: Dict[str, str] # e.g., { "track_name_or_id": "sample_id" }
 
 TEMP_EXPORT_DIR = "/tmp/cowriter_exports"
-if not os.path.exists(TEMP_EXPORT_DIR):
-    os.makedirs(TEMP_EXPORT_DIR)
+TICKS_PER_BEAT = 480 # Standard ticks per beat
+_note_start_time = operator.methodcaller("get", "start_time", 0) # Sort key without a per-note lambda call
+Path(TEMP_EXPORT_DIR).mkdir(parents=True, exist_ok=True)
+
+NUMPY_SORT_THRESHOLD = 256 # Below this many notes the plain Python path is faster than building arrays
+
+def _note_events(notes: List[Dict[str, Any]], ticks_per_second: float) -> List[tuple]:
+    """
+    Returns (pitch, velocity, start_ticks, duration_ticks) for each note, ordered by start time.
+    Large tracks are sorted and converted to ticks with NumPy. Both paths use a stable sort and
+    round-half-to-even, so they produce identical output.
+    """
+    if len(notes) <= NUMPY_SORT_THRESHOLD:
+        return [
+            (
+                note.get("pitch", 60),
+                note.get("velocity", 90),
+                round(note.get("start_time", 0) * ticks_per_second),
+                round(note.get("duration", 0.5) * ticks_per_second),
+            )
+            for note in sorted(notes, key=_note_start_time)
+        ]
+
+    starts = np.fromiter((note.get("start_time", 0) for note in notes), dtype=np.float64, count=len(notes))
+    durations = np.fromiter((note.get("duration", 0.5) for note in notes), dtype=np.float64, count=len(notes))
+    order = np.argsort(starts, kind="stable")
+    start_ticks = np.rint(starts[order] * ticks_per_second).astype(np.int64).tolist()
+    duration_ticks = np.rint(durations[order] * ticks_per_second).astype(np.int64).tolist()
+    ordered_notes = [notes[i] for i in order.tolist()]
+    return [
+        (note.get("pitch", 60), note.get("velocity", 90), start, duration)
+        for note, start, duration in zip(ordered_notes, start_ticks, duration_ticks)
+    ]
+
+async def _write_placeholder_stem(export_dir: str, filename: str, track_name: str, content: str) -> Dict[str, Any]:
+    """Writes one placeholder WAV stem and returns its entry for the export response."""
+    filepath = os.path.join(export_dir, filename) # Save in user-specific dir
+    try:
+        async with aiofiles.open(filepath, "w") as f:
+            await f.write(content)
+        return {
+            "track_name": track_name,
+            "filename": filename, # This is just the name, not full path
+            "message": "Placeholder WAV stem. Actual rendering TBD."
+        }
+    except Exception as e:
+        logger.warning("Error creating placeholder WAV for %s: %s", track_name, e)
+        return {
+            "track_name": track_name,
+            "filename": None,
+            "message": f"Failed to create placeholder WAV: {e}"
+        }
 
 @router.post("/export-project/", summary="Export project as MIDI and WAV stems")
 async def export_project(
     export_data: ProjectExportData = Body(...),
-    current_user: User = Depends(get_current_active_user) # Use the actual dependency
+    current_user: User = Depends(get_current_active_user), # Use the actual dependency
+    settings: Settings = Depends(get_settings)
 ) -> Any:
     """
     Exports the current project data as a MIDI file and placeholder WAV audio stems.
@@ -43,35 +132,29 @@ async def export_project(
     project_name_safe = "".join(c if c.isalnum() else "_" for c in export_data.project_name)
     # Create a user-specific subdirectory within TEMP_EXPORT_DIR to avoid filename clashes if multiple users export same project name
     user_export_dir = os.path.join(TEMP_EXPORT_DIR, user_id)
-    if not os.path.exists(user_export_dir):
-        os.makedirs(user_export_dir)
+    await asyncio.to_thread(Path(user_export_dir).mkdir, parents=True, exist_ok=True)
 
     # Using a more unique session ID that includes user_id to prevent potential clashes if multiple users export at the exact same microsecond
     # However, placing files in user_export_dir already mitigates this for file paths.
-    export_session_id = f"{project_name_safe}_{int(mido.second2tick(0, 480, export_data.tempo_bpm))}"
+    export_session_id = f"{project_name_safe}_{int(mido.second2tick(0, TICKS_PER_BEAT, export_data.tempo_bpm))}"
 
     # --- MIDI Export --- 
     try:
-        mid = mido.MidiFile(ticks_per_beat=480) # Standard ticks per beat
+        mid = mido.MidiFile(ticks_per_beat=TICKS_PER_BEAT)
+        # All tracks share one tempo, so the tempo message and the seconds->ticks factor are computed once.
+        # Equivalent to mido.second2tick(seconds, ticks_per_beat, tempo) without the per-note call overhead.
+        tempo = mido.bpm2tempo(export_data.tempo_bpm)
+        ticks_per_second = mid.ticks_per_beat * 1_000_000 / tempo
+        set_tempo_message = mido.MetaMessage("set_tempo", tempo=tempo)
 
         for track_data in export_data.midi_tracks:
             track = mido.MidiTrack()
             mid.tracks.append(track)
             track.append(mido.MetaMessage("track_name", name=track_data.get("track_name", "Unnamed Track")))
-            track.append(mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(export_data.tempo_bpm)))
+            track.append(set_tempo_message)
             
             current_time_ticks = 0
-            sorted_notes = sorted(track_data.get("notes", []), key=lambda x: x.get("start_time", 0))
-
-            for note_info in sorted_notes:
-                start_time_seconds = note_info.get("start_time", 0)
-                duration_seconds = note_info.get("duration", 0.5)
-                pitch = note_info.get("pitch", 60)
-                velocity = note_info.get("velocity", 90)
-
-                start_time_ticks = int(mido.second2tick(start_time_seconds, mid.ticks_per_beat, mido.bpm2tempo(export_data.tempo_bpm)))
-                duration_ticks = int(mido.second2tick(duration_seconds, mid.ticks_per_beat, mido.bpm2tempo(export_data.tempo_bpm)))
-                
+            for pitch, velocity, start_time_ticks, duration_ticks in _note_events(track_data.get("notes", []), ticks_per_second):
                 delta_on = start_time_ticks - current_time_ticks
                 track.append(mido.Message("note_on", note=pitch, velocity=velocity, time=max(0, delta_on)))
                 current_time_ticks += max(0, delta_on)
@@ -83,36 +166,25 @@ async def export_project(
             track.append(mido.MetaMessage("end_of_track", time=0))
 
         midi_filename = f"{export_session_id}.mid"
-        midi_filepath = os.path.join(user_export_dir, midi_filename) # Save in user-specific dir
-        mid.save(midi_filepath)
-        print(f"MIDI file saved to: {midi_filepath}")
+        midi_data = await asyncio.to_thread(_encode_midi, mid) # Serializing every track is CPU work; keep it off the event loop
+        _midi_export_cache.set((user_id, midi_filename), midi_data, time.time() + settings.EXPORT_CACHE_TTL_SECONDS)
+        logger.debug("MIDI file %s cached for user %s", midi_filename, user_id)
 
     except Exception as e:
-        print(f"Error creating MIDI file: {e}")
+        logger.exception("Error creating MIDI file")
         raise HTTPException(status_code=500, detail=f"Could not generate MIDI file: {e}")
 
     # --- WAV Export (Placeholder) ---
-    wav_files_info = []
+    # Stems are independent, so they're written concurrently rather than one after another.
+    # When real rendering lands it is CPU-bound: run it per track in a ProcessPoolExecutor instead.
+    stem_writes = []
     for i, track_data in enumerate(export_data.midi_tracks):
         track_name = track_data.get("track_name", f"Track_{i+1}")
         wav_filename_placeholder = f"{export_session_id}_{track_name.replace(' ', '_')}.wav"
-        wav_filepath_placeholder = os.path.join(user_export_dir, wav_filename_placeholder) # Save in user-specific dir
-        
-        try:
-            with open(wav_filepath_placeholder, "w") as f:
-                f.write(f"Placeholder WAV for {track_name} - User: {user_id}")
-            wav_files_info.append({
-                "track_name": track_name,
-                "filename": wav_filename_placeholder, # This is just the name, not full path
-                "message": "Placeholder WAV stem. Actual rendering TBD."
-            })
-        except Exception as e:
-            print(f"Error creating placeholder WAV for {track_name}: {e}")
-            wav_files_info.append({
-                "track_name": track_name,
-                "filename": None,
-                "message": f"Failed to create placeholder WAV: {e}"
-            })
+        stem_writes.append(_write_placeholder_stem(
+            user_export_dir, wav_filename_placeholder, track_name, f"Placeholder WAV for {track_name} - User: {user_id}"
+        ))
+    wav_files_info = await asyncio.gather(*stem_writes)
 
     return {
         "message": "Project export initiated. MIDI file generated. WAV stems are placeholders.",
@@ -141,15 +213,24 @@ async def download_exported_file(user_id_from_path: str, filename: str, current_
     if current_user.id != user_id_from_path:
         raise HTTPException(status_code=403, detail="Forbidden: You do not have access to this file.")
 
-    filepath = os.path.join(TEMP_EXPORT_DIR, user_id_from_path, filename)
-    if not os.path.isfile(filepath):
+    midi_data = _midi_export_cache.get((user_id_from_path, filename))
+    if midi_data is not None:
+        return Response(content=midi_data, media_type="audio/midi", headers=_attachment_headers(filename))
+
+    # Resolve the path and make sure it stays inside the user's export directory (no ../ traversal)
+    user_export_root = Path(TEMP_EXPORT_DIR, user_id_from_path).resolve()
+    filepath = (user_export_root / filename).resolve()
+    if user_export_root not in filepath.parents:
+        raise HTTPException(status_code=403, detail="Forbidden: You do not have access to this file.")
+
+    # Stat once and hand the result to the response so it doesn't stat the file again
+    try:
+        stat_result = filepath.stat()
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found or export session expired.")
-    
-    media_type = "application/octet-stream"
-    if filename.lower().endswith(".mid") or filename.lower().endswith(".midi"):
-        media_type = "audio/midi"
-    elif filename.lower().endswith(".wav"):
-        media_type = "audio/wav"
-        
-    return FileResponse(filepath, media_type=media_type, filename=filename)
+
+    media_type = _MEDIA_TYPES.get(filepath.suffix.lower(), "application/octet-stream")
+    return ExportFileResponse(filepath, media_type=media_type, filename=filename, stat_result=stat_result)
 
@@ -9,6 +9,8 @@ from app.schemas.user import User # Import the User schema
 
 router = APIRouter()
 
+ALLOWED_SAMPLE_CONTENT_TYPES = frozenset({"audio/wav", "audio/x-wav", "audio/wave"})
+
 @router.post("/upload-sample/", summary="Upload a WAV instrument sample")
 async def upload_sample(
     sample_file: UploadFile = File(...),
@@ -23,22 +25,24 @@ async def upload_sample(
     - **instrument_name**: A name for the instrument this sample represents (e.g., "Kick Drum", "My Synth Pad").
     - Requires authentication.
     """
-    if not sample_file.content_type == "audio/wav":
+    # Size and multipart framing are enforced by UploadLimitMiddleware before the body is received
+    if sample_file.content_type not in ALLOWED_SAMPLE_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid audio file type: {sample_file.content_type}. Please upload a WAV file.")
 
     try:
-        sample_content = await sample_file.read()
         user_id = current_user.id # Use user ID from authenticated user
         
-        # In a real implementation, pass to a service that handles Firebase Storage upload:
-        # sample_metadata = await store_sample(user_id, sample_content, sample_file.filename, instrument_name)
+        # The body is never read into memory here. The upload is already spooled by Starlette,
+        # so the storage service should stream sample_file.file into a Firebase Storage
+        # resumable upload (blob.upload_from_file) instead of taking bytes:
+        # sample_metadata = await store_sample(user_id, sample_file.file, sample_file.filename, instrument_name)
         
         # Placeholder response
         sample_metadata = {
             "filename": sample_file.filename,
             "instrument_name": instrument_name,
             "user_id": user_id,
-            "size_bytes": len(sample_content),
+            "size_bytes": sample_file.size,
             "status": "upload_success_placeholder",
             "message": "Sample received. Actual storage in Firebase Storage under user path pending service implementation.",
             "sample_id": f"sample_{user_id}_{instrument_name.replace(' ', '_')}_{sample_file.filename}" # Placeholder ID
@@ -1,5 +1,8 @@
 # backend/app/api/v1/endpoints/voice_processing.py
+import logging
+import orjson
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi.responses import Response
 from typing import Any
 
 from app.services.voice_to_midi_service import process_voice_to_midi
@@ -7,6 +10,7 @@ from app.api.deps import get_current_active_user # Import the actual dependency
 from app.schemas.user import User # Import the User schema
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/voice-to-midi/", summary="Convert voice audio to MIDI")
 async def convert_voice_to_midi(
@@ -20,27 +24,28 @@ async def convert_voice_to_midi(
     - **audio_file**: The uploaded audio file.
     - Requires authentication.
     """
-    if not audio_file.content_type.startswith("audio/"):
+    # Size and multipart framing are enforced by UploadLimitMiddleware before the body is received
+    if not (audio_file.content_type or "").startswith("audio/"):
         # A more robust check might be needed for specific formats like WAV, MP3
         raise HTTPException(status_code=400, detail=f"Invalid audio file type: {audio_file.content_type}. Please upload a supported audio format.")
 
     try:
-        # Read audio file content
-        audio_content = await audio_file.read()
         user_id = current_user.id # Get user ID for context, if needed by the service
         
-        # Process the audio content using the service
+        # Process the audio file using the service
         # The service might use user_id for logging, or if it stores user-specific models/data
-        midi_data = await process_voice_to_midi(audio_content, audio_file.filename, user_id=user_id)
+        # The upload's spooled temp file (already on disk past 1MB) is decoded in place, never read into memory
+        midi_data = await process_voice_to_midi(audio_file.file, audio_file.filename, user_id=user_id)
         
         if midi_data.get("status") == "error_placeholder":
             raise HTTPException(status_code=500, detail=midi_data.get("message", "Unknown error during MIDI conversion."))
 
-        return midi_data
+        # The result is already plain JSON types, so skip FastAPI's recursive jsonable_encoder pass over every note
+        return Response(content=orjson.dumps(midi_data), media_type="application/json")
     except HTTPException as http_exc: # Re-raise HTTPExceptions to ensure they are not caught by the generic Exception handler
         raise http_exc
     except Exception as e:
         # Log the exception details for debugging
-        print(f"Unhandled exception in convert_voice_to_midi for user {current_user.id if current_user else 'Unknown'}: {str(e)}")
+        logger.exception("Unhandled exception in convert_voice_to_midi for user %s", current_user.id if current_user else "Unknown")
         raise HTTPException(status_code=500, detail=f"Error processing audio file: {str(e)}")
 
@@ -0,0 +1,36 @@
+# backend/app/core/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+class TTLCache:
+    """
+    Small in-process cache where every entry carries its own expiry timestamp.
+    Entries are evicted in insertion order (FIFO) once max_size is reached.
+    Plain dict operations are atomic under the GIL, so no lock is needed for lookups.
+    """
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Hashable, skew: float = 0.0) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time() + skew:
+            self._entries.pop(key, None) # Expired, drop it so the next lookup is a clean miss
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False) # FIFO eviction of the oldest entry
+
+    def pop(self, key: Hashable) -> Any | None:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self) -> None:
+        self._entries.clear()
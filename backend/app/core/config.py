@@ -1,14 +1,29 @@
 # backend/app/core/config.py
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(case_sensitive=True, env_file=".env", extra="ignore")
+
     PROJECT_NAME: str = "Cowriter API"
     API_V1_STR: str = "/api/v1"
     FIREBASE_CREDENTIALS_PATH: str | None = None # Set this if using a local JSON key file
+    FIREBASE_PROJECT_ID: str | None = None # Expected audience of Firebase ID tokens
+    JWKS_CACHE_PATH: str | None = "/tmp/cowriter_jwks_cache.json" # Disk copy of Google's token-signing keys shared by workers; None keeps them in memory only
+    STRIPE_WEBHOOK_SECRET: str | None = None # Signing secret used to verify incoming Stripe webhooks
+    MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024 # Largest audio upload accepted by the voice and sample endpoints
+    EXPORT_CACHE_TTL_SECONDS: int = 600 # How long an exported MIDI file stays downloadable; it is kept in memory only
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = 300 # Upper bound on how long a verified ID token is reused before re-verification
+    USER_CACHE_TTL_SECONDS: int = 60 # How long a loaded user record is reused before reloading
+    WARM_UP_VOICE_MODEL: bool = False # Load CREPE/TensorFlow in the background at startup; faster first voice request, but every worker pays the memory even if it never processes voice
+    LOG_LEVEL: str = "INFO" # Root log level; set to DEBUG to see per-request voice processing details
     # Add other configurations here as needed
 
-    class Config:
-        case_sensitive = True
-
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Returns the process-wide Settings, parsing the environment and .env only once.
+    Endpoints should depend on this (Depends(get_settings)) so tests can override it.
+    """
+    return Settings()
 
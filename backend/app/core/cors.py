@@ -0,0 +1,80 @@
+# backend/app/core/cors.py
+from typing import Iterable
+
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+DEFAULT_HEADERS = ("Authorization", "Content-Type")
+
+class CORSMiddlewarePureASGI:
+    """
+    Minimal CORS handling written directly against ASGI, so no Request/Response objects are built.
+    Preflights from allowed origins are answered here with allow-methods/allow-headers values
+    precomputed at construction and an Access-Control-Max-Age so browsers can cache them.
+    Other requests from allowed origins get the CORS headers appended to their
+    http.response.start message.
+    """
+    def __init__(
+        self,
+        app,
+        allow_origins: Iterable[str],
+        allow_methods: Iterable[str] = ALL_METHODS,
+        allow_headers: Iterable[str] = DEFAULT_HEADERS,
+        allow_credentials: bool = True,
+        max_age: int = 86400,
+    ):
+        self.app = app
+        self.allow_origins = frozenset(origin.encode() for origin in allow_origins)
+        self.credentials_headers = [(b"access-control-allow-credentials", b"true")] if allow_credentials else []
+        self.preflight_headers = [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode()),
+            (b"access-control-allow-headers", ", ".join(allow_headers).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+        ] + self.credentials_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+
+        if origin is None: # Not a cross-origin request
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight_response(send, origin)
+            return
+
+        if origin not in self.allow_origins:
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = [(b"access-control-allow-origin", origin), (b"vary", b"Origin")] + self.credentials_headers
+
+        async def send_with_cors_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors_headers)
+
+    async def _preflight_response(self, send, origin: bytes) -> None:
+        if origin not in self.allow_origins:
+            body = b"Disallowed CORS origin"
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # The browser enforces the method/header lists, so nothing from the request is echoed back
+        headers = [(b"access-control-allow-origin", origin), (b"vary", b"Origin")] + self.preflight_headers
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
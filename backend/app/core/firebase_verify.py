@@ -0,0 +1,144 @@
+# backend/app/core/firebase_verify.py
+# Minimal Firebase ID token verifier built on PyJWT.
+# firebase_admin is only needed for Storage/Firestore; token verification is plain RS256 JWT
+# checking against Google's published JWKS, so it is done here without the SDK.
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict
+
+import httpx
+import jwt
+
+JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+DEFAULT_JWKS_MAX_AGE_SECONDS = 3600 # Used when Google's response carries no Cache-Control max-age
+CLOCK_SKEW_SECONDS = 5
+UNKNOWN_KID_REFRESH_INTERVAL_SECONDS = 60 # Minimum gap between refetches triggered by an unrecognized key ID
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+logger = logging.getLogger(__name__)
+
+class InvalidIdTokenError(Exception):
+    """Raised when an ID token is malformed or fails signature/claim checks."""
+
+class ExpiredIdTokenError(InvalidIdTokenError):
+    """Raised when an otherwise valid ID token has expired."""
+
+# kid -> PyJWK, refreshed once the Cache-Control max-age of the last fetch has passed.
+# An unknown kid only forces an early refresh if the key set is older than UNKNOWN_KID_REFRESH_INTERVAL_SECONDS,
+# so tokens with made-up key IDs can't turn every request into a fetch from Google.
+_jwks: Dict[str, jwt.PyJWK] = {}
+_jwks_expires_at = 0.0
+_jwks_loaded_at = 0.0
+_jwks_lock = asyncio.Lock()
+
+def _read_jwks_cache(cache_path: str) -> Dict[str, Any] | None:
+    """Returns the key set saved by _write_jwks_cache if it is still within its max-age."""
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if time.time() < cached["expires_at"]:
+            return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass # Missing or unreadable cache: fall through to a network fetch
+    return None
+
+def _write_jwks_cache(cache_path: str, cached: Dict[str, Any]) -> None:
+    # Write then rename so other workers never read a half-written file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(cached, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write JWKS cache to %s: %s", cache_path, e)
+
+def _set_jwks(jwks: Dict[str, Any], expires_at: float) -> None:
+    global _jwks, _jwks_expires_at, _jwks_loaded_at
+    key_set = jwt.PyJWKSet.from_dict(jwks)
+    _jwks = {key.key_id: key for key in key_set.keys}
+    _jwks_expires_at = expires_at
+    _jwks_loaded_at = time.time()
+
+def _jwks_needs_refresh(kid: str) -> bool:
+    now = time.time()
+    if now >= _jwks_expires_at:
+        return True
+    # Google rotates keys ahead of use, so an unknown kid is usually bogus; refetch for it at most once per interval
+    return kid not in _jwks and now - _jwks_loaded_at >= UNKNOWN_KID_REFRESH_INTERVAL_SECONDS
+
+async def _refresh_jwks(cache_path: str | None) -> None:
+    if cache_path and not _jwks:
+        # Cold worker: reuse keys another process (or a previous run) fetched while they are still fresh
+        cached = await asyncio.to_thread(_read_jwks_cache, cache_path)
+        if cached is not None:
+            _set_jwks(cached["jwks"], cached["expires_at"])
+            return
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        response = await client.get(JWKS_URL)
+        response.raise_for_status()
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+    max_age = int(match.group(1)) if match else DEFAULT_JWKS_MAX_AGE_SECONDS
+    jwks = response.json()
+    _set_jwks(jwks, time.time() + max_age)
+    if cache_path:
+        await asyncio.to_thread(_write_jwks_cache, cache_path, {"jwks": jwks, "expires_at": _jwks_expires_at})
+
+async def _get_signing_key(kid: str, cache_path: str | None) -> jwt.PyJWK:
+    if _jwks_needs_refresh(kid):
+        async with _jwks_lock:
+            # Another request may have refreshed the key set while we waited for the lock
+            if _jwks_needs_refresh(kid):
+                await _refresh_jwks(cache_path)
+    key = _jwks.get(kid)
+    if key is None:
+        raise InvalidIdTokenError(f"ID token has an unknown key ID: {kid}")
+    return key
+
+async def verify_token(token: str, project_id: str | None, jwks_cache_path: str | None = None) -> Dict[str, Any]:
+    """
+    Verifies a Firebase ID token and returns its decoded claims.
+    Mirrors firebase_admin.auth.verify_id_token: the decoded claims include a "uid" key.
+    If jwks_cache_path is set, Google's signing keys are also kept on disk there for their max-age,
+    so cold-started workers don't have to refetch them.
+    """
+    if not project_id:
+        raise ValueError("FIREBASE_PROJECT_ID must be configured to verify ID tokens.")
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise InvalidIdTokenError(str(e)) from e
+    if header.get("alg") != "RS256" or not header.get("kid"):
+        raise InvalidIdTokenError("ID token must be signed with RS256 and carry a key ID.")
+
+    signing_key = await _get_signing_key(header["kid"], jwks_cache_path)
+    try:
+        # RSA signature verification is CPU-bound; run it in the threadpool so it doesn't block the event loop
+        claims = await asyncio.to_thread(
+            jwt.decode,
+            token,
+            signing_key.key,
+            algorithms=["RS256"],
+            audience=project_id,
+            issuer=f"https://securetoken.google.com/{project_id}",
+            leeway=CLOCK_SKEW_SECONDS,
+            options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+        )
+    except jwt.ExpiredSignatureError as e:
+        raise ExpiredIdTokenError(str(e)) from e
+    except jwt.InvalidTokenError as e:
+        raise InvalidIdTokenError(str(e)) from e
+
+    uid = claims["sub"]
+    if not isinstance(uid, str) or not uid or len(uid) > 128:
+        raise InvalidIdTokenError("ID token has an invalid subject (UID).")
+    if claims.get("auth_time", 0) > time.time() + CLOCK_SKEW_SECONDS:
+        raise InvalidIdTokenError("ID token has an auth_time in the future.")
+    claims["uid"] = uid
+    return claims
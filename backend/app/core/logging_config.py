@@ -0,0 +1,24 @@
+# backend/app/core/logging_config.py
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+def setup_logging(level: int | str = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    Routes root-logger records through a QueueHandler so request handlers only enqueue them;
+    a QueueListener thread performs the blocking write to stderr.
+    Returns the started listener; call .stop() on shutdown to flush pending records.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root_logger = logging.getLogger()
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root_logger.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,85 @@
+# backend/app/core/upload_limits.py
+# FastAPI parses multipart bodies before any dependency runs, so a Depends() check would only
+# fire after the whole upload had been received. This pure-ASGI middleware checks the request
+# headers instead and rejects bad uploads before the body is read.
+import json
+from typing import Iterable
+
+from fastapi import HTTPException
+
+class _BodyTooLarge(HTTPException):
+    """Raised from the wrapped receive once a body without Content-Length passes max_bytes."""
+
+class UploadLimitMiddleware:
+    """
+    Rejects uploads to the given path prefixes unless they are multipart/form-data no larger
+    than max_bytes. Checks run in order and stop at the first failure: content type (415), then
+    Content-Length validity (400), then size (413). Chunked uploads without a Content-Length are
+    counted as they are received and rejected with 413 as soon as they pass the limit.
+    """
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self._reject(send, 415, "Uploads must be sent as multipart/form-data.")
+            return
+        content_length = headers.get(b"content-length")
+        if content_length is None:
+            await self._call_with_body_limit(scope, receive, send)
+            return
+        try:
+            size = int(content_length)
+        except ValueError:
+            await self._reject(send, 400, "Invalid Content-Length header.")
+            return
+        if size > self.max_bytes:
+            await self._reject(send, 413, f"Upload exceeds the maximum size of {self.max_bytes} bytes.")
+            return
+
+        await self.app(scope, receive, send)
+
+    async def _call_with_body_limit(self, scope, receive, send) -> None:
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413 response
+                    raise _BodyTooLarge(413, f"Upload exceeds the maximum size of {self.max_bytes} bytes.")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge as e:
+            # Only reached if nothing inside the app turned the exception into a response
+            if response_started:
+                raise
+            await self._reject(send, e.status_code, e.detail)
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
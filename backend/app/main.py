@@ -1,44 +1,102 @@
 # backend/app/main.py
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI
+from fastapi.responses import Response
 import firebase_admin
 from firebase_admin import credentials
-from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from pydantic import BaseModel
+import msgspec
 
 # Import routers
 from app.api.v1.endpoints import voice_processing, samples, ai_suggestions, exports, billing # Added billing router
 # from app.api.v1.endpoints import auth as auth_router # Assuming auth.py will be created for token endpoint
-from app.core.config import settings # Import settings for Firebase credentials path
+from app.core.config import get_settings
+from app.core.cors import CORSMiddlewarePureASGI
+from app.core.logging_config import setup_logging
+from app.core.upload_limits import UploadLimitMiddleware
+from app.services.voice_to_midi_service import warm_up_voice_model
 
-# Initialize Firebase Admin SDK
-# This should be done once when the application starts.
-if not firebase_admin._apps:
+logger = logging.getLogger(__name__)
+
+# App construction (middleware, router prefixes) and startup need settings before any request exists,
+# so main.py is the one module that reads them directly. Endpoint code uses Depends(get_settings).
+settings = get_settings()
+
+@lru_cache(maxsize=1)
+def _init_firebase() -> None:
+    # Cached so repeated lifespan runs (e.g. several TestClient contexts) initialize at most once per process
+    if firebase_admin._apps:
+        return
     try:
         if settings.FIREBASE_CREDENTIALS_PATH:
             cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
             firebase_admin.initialize_app(cred)
-            print("Firebase Admin SDK initialized with service account file.")
+            logger.info("Firebase Admin SDK initialized with service account file.")
         else:
             firebase_admin.initialize_app()
-            print("Firebase Admin SDK initialized with Application Default Credentials.")
-    except Exception as e:
-        print(f"Error initializing Firebase Admin SDK: {e}")
+            logger.info("Firebase Admin SDK initialized with Application Default Credentials.")
+    except Exception:
+        logger.exception("Error initializing Firebase Admin SDK")
+
+async def _warm_up_voice_model() -> None:
+    try:
+        await asyncio.to_thread(warm_up_voice_model)
+        logger.info("Voice-to-MIDI model warmed up.")
+    except Exception:
+        logger.exception("Voice-to-MIDI model warm-up failed; the first request will load it instead.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener = setup_logging(settings.LOG_LEVEL.upper())
+    if not settings.FIREBASE_PROJECT_ID:
+        # Still start so unauthenticated endpoints work locally, but make the misconfiguration visible up front
+        logger.warning("FIREBASE_PROJECT_ID is not set; every authenticated request will fail until it is configured.")
+    # Initialize Firebase Admin SDK once per worker at startup rather than at module import,
+    # so tools and tests that only import the app don't parse credentials.
+    # Run in a thread: Application Default Credentials can block on a metadata-server lookup.
+    warm_up_task = None
+    try:
+        await asyncio.to_thread(_init_firebase)
+        if settings.WARM_UP_VOICE_MODEL:
+            # Load CREPE/TensorFlow in the background so startup isn't delayed but the first /process request is warm
+            warm_up_task = app.state.voice_model_warm_up = asyncio.create_task(_warm_up_voice_model())
+        yield
+    finally:
+        if warm_up_task is not None and not warm_up_task.done():
+            # Cancelling only stops waiting; the executor thread finishes the load on its own
+            warm_up_task.cancel()
+            await asyncio.gather(warm_up_task, return_exceptions=True)
+        log_listener.stop() # Flush queued log records even if shutdown raised
 
 app = FastAPI(
     title="Cowriter API",
     description="API for the Cowriter application, supporting songwriting and collaboration.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+# Reject oversized or non-multipart uploads before their bodies are read.
+# Registered before CORS so CORS stays the outermost layer and rejections still carry CORS headers.
 app.add_middleware(
-    CORSMiddleware,
+    UploadLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_BYTES,
+    paths=[
+        f"{settings.API_V1_STR}/process/voice-to-midi/",
+        f"{settings.API_V1_STR}/samples/upload-sample/",
+    ],
+)
+
+# Add CORS middleware (pure ASGI; preflights are answered directly and cached by browsers for a day)
+app.add_middleware(
+    CORSMiddlewarePureASGI,
     allow_origins=["https://cowriter-frontend.vercel.app", "http://localhost:3000"],
+    allow_methods=("GET", "POST", "PUT", "DELETE", "OPTIONS"),
+    allow_headers=("Authorization", "Content-Type"), # All the frontend sends (Bearer token, JSON/multipart bodies)
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
- )
+    max_age=86400,
+)
 
 # Include API routers
 # app.include_router(auth_router.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"]) # Example if auth.py exists
@@ -50,18 +108,21 @@ app.include_router(exports.router, prefix=f"{settings.API_V1_STR}/exports", tags
 app.include_router(billing.router, prefix=f"{settings.API_V1_STR}/billing", tags=["Billing"])
 
 # Direct samples endpoint for frontend connection
-class Sample(BaseModel):
+# A msgspec Struct rather than a pydantic model: this DTO needs no validation, only fast encoding
+class Sample(msgspec.Struct):
     id: int
     name: str
     content: str
 
-@app.get("/api/samples", response_model=List[Sample])
+# For testing, return some dummy data. The payload never changes, so it is encoded once at import
+_SAMPLES_JSON = msgspec.json.encode([
+    Sample(id=1, name="Sample 1", content="This is sample content 1"),
+    Sample(id=2, name="Sample 2", content="This is sample content 2")
+])
+
+@app.get("/api/samples")
 async def get_samples():
-    # For testing, return some dummy data
-    return [
-        {"id": 1, "name": "Sample 1", "content": "This is sample content 1"},
-        {"id": 2, "name": "Sample 2", "content": "This is sample content 2"}
-    ]
+    return Response(content=_SAMPLES_JSON, media_type="application/json")
 
 @app.get("/", summary="Root endpoint for health check")
 async def read_root():
@@ -1,7 +1,7 @@
 # backend/app/schemas/subscription.py
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Literal
-from datetime import datetime
+from datetime import datetime, timezone
 
 class SubscriptionBase(BaseModel):
     user_id: str
@@ -28,12 +28,11 @@ class SubscriptionInDB(SubscriptionBase):
     id: str # Subscription ID from Stripe or your system
     stripe_subscription_id: Optional[str] = None
     stripe_customer_id: Optional[str] = None
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    # default_factory so each instance gets its own timestamp (a plain default is evaluated once at import)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Subscription(SubscriptionInDB):
     pass
@@ -1,5 +1,5 @@
 # backend/app/schemas/user.py
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
 
 class UserBase(BaseModel):
@@ -19,9 +19,7 @@ class UserUpdate(UserBase):
 class UserInDBBase(UserBase):
     id: Optional[str] = None # UID from Firebase
 
-    class Config:
-        orm_mode = True # Compatibility with ORMs, though Firebase is NoSQL
-        from_attributes = True # Pydantic V2
+    model_config = ConfigDict(from_attributes=True) # Compatibility with ORMs, though Firebase is NoSQL
 
 # Additional properties to return via API
 class User(UserInDBBase):
@@ -1,88 +1,178 @@
 # backend/app/services/voice_to_midi_service.py
-import librosa
+import asyncio
+import functools
+import logging
+import threading
 import numpy as np
-import crepe # Import crepe
-from typing import List, Dict, Any
-import io
+from typing import BinaryIO, List, Dict, Any
 
-# Helper function to convert frequency to MIDI note number
-def freq_to_midi(freq):
-    if freq <= 0:
-        return 0 # Or handle as a rest or invalid note
-    return int(round(69 + 12 * np.log2(freq / 440.0)))
+logger = logging.getLogger(__name__)
 
-async def process_voice_to_midi(audio_content: bytes, filename: str) -> Dict[str, Any]:
+TARGET_SAMPLE_RATE = 16000 # CREPE expects 16kHz sample rate
+CREPE_MODEL_CAPACITY = "tiny" # Using "tiny" model for speed
+CREPE_STEP_SIZE_MS = 10
+CREPE_FRAME_LENGTH = 1024 # Samples per CREPE input frame
+CREPE_BATCH_SIZE = 512 # Frames per model.predict batch; the first conv layer alone outputs ~128KB per frame, so keep this modest
+MIN_CONFIDENCE = 0.6 # Minimum confidence to consider a pitch valid
+MIN_NOTE_DURATION_MS = 50 # Minimum duration for a note in milliseconds
+
+@functools.lru_cache(maxsize=1)
+def _audio_deps():
+    """
+    Imports librosa and crepe on first use instead of at module import. crepe pulls in TensorFlow,
+    which takes seconds and hundreds of MB; workers that never process voice never load it.
+    """
+    import crepe
+    import librosa
+    return librosa, crepe
+
+def _decode_audio(audio_file: BinaryIO):
+    """Decodes the stream to float32 mono samples and returns (samples, native sample rate)."""
+    import soundfile as sf
+    audio_file.seek(0)
+    with sf.SoundFile(audio_file) as f:
+        if f.subtype == "PCM_16":
+            # 16-bit PCM can be decoded as int16 and scaled once, halving the bytes moved while decoding.
+            # Other subtypes (float, 24/32-bit PCM) must be decoded as float: libsndfile doesn't rescale them to int16.
+            pcm = f.read(dtype="int16", always_2d=True)
+            y = pcm.mean(axis=1, dtype=np.float32) if pcm.shape[1] > 1 else pcm[:, 0].astype(np.float32)
+            y *= np.float32(1 / 32768) # Scale to [-1, 1) in place
+        else:
+            y = f.read(dtype="float32", always_2d=True)
+            y = y.mean(axis=1) if y.shape[1] > 1 else y[:, 0] # Downmix to mono like librosa.load does
+        return y, f.samplerate
+
+def _load_audio(audio_file: BinaryIO):
+    """
+    Reads audio as float32 mono at TARGET_SAMPLE_RATE. soundfile decodes the stream directly and
+    resampling is skipped when the file is already 16kHz (the usual case for voice capture).
+    Only formats libsndfile can decode are supported: WAV/FLAC/OGG, and MP3 with the libsndfile 1.2
+    bundled in the pinned soundfile wheels. Anything else raises soundfile.LibsndfileError.
+    """
+    librosa, _ = _audio_deps()
+    y, native_sr = _decode_audio(audio_file)
+    if native_sr != TARGET_SAMPLE_RATE:
+        y = librosa.resample(y, orig_sr=native_sr, target_sr=TARGET_SAMPLE_RATE, res_type="soxr_hq")
+    return y, TARGET_SAMPLE_RATE
+
+_crepe_model_lock = threading.Lock()
+
+def _crepe_model():
+    """Returns the CREPE Keras model, building it and loading its weights on first use."""
+    _, crepe = _audio_deps()
+    # crepe.core memoizes models per capacity, but its check-then-build isn't thread-safe, so the
+    # lock keeps the warm-up thread and the first request from building the model twice
+    with _crepe_model_lock:
+        return crepe.core.build_and_load_model(CREPE_MODEL_CAPACITY)
+
+def _crepe_predict(y: np.ndarray, sr: int):
+    """
+    Same output as crepe.predict(y, sr, viterbi=True, center=True) for 16kHz mono input, but runs the
+    cached model directly with CREPE_BATCH_SIZE frames per batch instead of Keras' default of 32.
+    Returns (time, cents, confidence, activation); cents are relative to 10 Hz as in crepe, NaN when undefined.
+    """
+    librosa, crepe = _audio_deps()
+    hop_length = sr * CREPE_STEP_SIZE_MS // 1000
+
+    # Centre the frames on their timestamps, then normalize each 1024-sample frame like crepe does
+    audio = np.pad(y, CREPE_FRAME_LENGTH // 2, mode="constant")
+    frames = librosa.util.frame(audio, frame_length=CREPE_FRAME_LENGTH, hop_length=hop_length, axis=0)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    frames /= np.clip(frames.std(axis=1, keepdims=True), 1e-8, None)
+
+    activation = _crepe_model().predict(frames, batch_size=CREPE_BATCH_SIZE, verbose=0)
+    confidence = activation.max(axis=1)
+    cents = crepe.core.to_viterbi_cents(activation)
+    time = np.arange(confidence.shape[0]) * CREPE_STEP_SIZE_MS / 1000.0
+    return time, cents, confidence, activation
+
+def warm_up_voice_model() -> None:
     """
-    Processes the raw audio content using CREPE for pitch detection and converts it to MIDI-like data.
+    Imports the audio libraries, builds the CREPE model and runs it once on a second of silence, so
+    everything is ready before the first real request. Blocking; run it in a thread.
     """
-    print(f"Received audio for MIDI conversion: {filename}, size: {len(audio_content)} bytes")
+    _crepe_predict(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32), TARGET_SAMPLE_RATE)
+
+# CREPE's cents are relative to 10 Hz, so MIDI = 69 + 12*log2(10 * 2**(cents/1200) / 440) reduces to an affine map
+CENTS_TO_MIDI_OFFSET = 69 - 12 * np.log2(440.0 / 10.0)
+
+# Helper function to convert CREPE cents to MIDI note numbers (works on scalars and arrays)
+def cents_to_midi(cents):
+    return np.round(np.asarray(cents, dtype=np.float64) / 100 + CENTS_TO_MIDI_OFFSET).astype(np.int16)
+
+def _segment_notes(time: np.ndarray, cents: np.ndarray, confidence: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Groups consecutive confident frames with the same MIDI pitch into notes.
+    A note ends at the first frame whose pitch differs or whose confidence drops (or at the last frame),
+    and notes shorter than MIN_NOTE_DURATION_MS are dropped.
+    """
+    n_frames = len(time)
+    if n_frames == 0:
+        return []
+
+    valid = (confidence >= MIN_CONFIDENCE) & ~np.isnan(cents)
+    midi = np.zeros(n_frames, dtype=np.int16) # Invalid frames map to 0 (rest or invalid note)
+    midi[valid] = cents_to_midi(cents[valid])
+
+    # A run starts wherever the pitch or the validity changes; runs of invalid frames are discarded
+    changes = np.empty(n_frames, dtype=bool)
+    changes[0] = True
+    changes[1:] = (midi[1:] != midi[:-1]) | (valid[1:] != valid[:-1])
+    run_starts = np.flatnonzero(changes)
+    run_ends = np.append(run_starts[1:], n_frames)
+    voiced = valid[run_starts]
+    starts, ends = run_starts[voiced], run_ends[voiced]
+
+    # The last note is closed at the final frame's timestamp.
+    # The minimum-duration filter compares float seconds exactly like the original per-frame loop, so
+    # notes right at MIN_NOTE_DURATION_MS are kept or dropped as before; only the output is quantized.
+    end_frames = np.minimum(ends, n_frames - 1)
+    keep = (time[end_frames] - time[starts]) * 1000 >= MIN_NOTE_DURATION_MS
+    starts, end_frames = starts[keep], end_frames[keep]
+
+    # Quantize note boundaries to integer milliseconds once, so start + duration lands exactly on the next boundary
+    time_ms = np.rint(time * 1000).astype(np.int64)
+    start_ms = time_ms[starts]
+    duration_ms = time_ms[end_frames] - start_ms
+    velocities = (confidence[starts] * 100).astype(np.int64) + 27
+
+    # The API contract is seconds; convert to Python scalars in bulk (tolist) rather than per note
+    return [
+        {"pitch": pitch, "start_time": start_time, "duration": duration, "velocity": velocity}
+        for pitch, start_time, duration, velocity in zip(
+            midi[starts].tolist(), (start_ms / 1000).tolist(), (duration_ms / 1000).tolist(), velocities.tolist()
+        )
+    ]
+
+async def process_voice_to_midi(audio_file: BinaryIO, filename: str, user_id: str | None = None) -> Dict[str, Any]:
+    """
+    Processes the seekable binary audio_file (e.g. an UploadFile's spooled temp file) using CREPE for
+    pitch detection and converts it to MIDI-like data. The file is decoded straight from the stream.
+    """
+    logger.debug("Received audio for MIDI conversion: %s, user: %s", filename, user_id)
 
     try:
-        audio_stream = io.BytesIO(audio_content)
-        y, sr = librosa.load(audio_stream, sr=16000) # CREPE expects 16kHz sample rate
-        duration = librosa.get_duration(y=y, sr=sr)
-        print(f"Audio loaded and resampled to 16kHz. Duration: {duration:.2f}s, Sample Rate: {sr} Hz")
+        # Everything blocking (library import on a cold worker, decoding, TF inference) runs in the
+        # threadpool so other requests keep being served while a voice clip is processed.
+        y, sr = await asyncio.to_thread(_load_audio, audio_file)
+        duration = y.shape[-1] / sr
+        logger.debug("Audio loaded and resampled to 16kHz. Duration: %.2fs, Sample Rate: %d Hz", duration, sr)
 
         # Perform pitch detection using CREPE
         # time: timestamps of the analysis frames
-        # frequency: instantaneous frequency at each frame
+        # cents: pitch at each frame in cents relative to 10 Hz
         # confidence: confidence of the pitch estimation (0 to 1)
         # activation: raw model output
-        time, frequency, confidence, activation = crepe.predict(y, sr, viterbi=True, model_capacity="tiny", step_size=10) # Using "tiny" model for speed, step_size in ms
+        time, cents, confidence, activation = await asyncio.to_thread(_crepe_predict, y, sr)
 
-        print(f"CREPE analysis complete. Found {len(frequency)} frequency points.")
+        logger.debug("CREPE analysis complete. Found %d pitch points.", len(cents))
 
-        # Convert frequency contour to MIDI-like notes
+        # Convert pitch contour to MIDI-like notes
         # This is a simplified conversion. A more robust solution would involve note segmentation, 
         # onset/offset detection, and potentially velocity estimation.
-        midi_notes = []
-        min_confidence = 0.6 # Minimum confidence to consider a pitch valid
-        min_note_duration_ms = 50 # Minimum duration for a note in milliseconds
-        
-        current_note = None
-        for i in range(len(time)):
-            t = time[i]
-            f = frequency[i]
-            c = confidence[i]
-
-            if c >= min_confidence and f > 0:
-                midi_pitch = freq_to_midi(f)
-                if current_note is None:
-                    current_note = {"pitch": midi_pitch, "start_time": t, "velocity": int(c * 100) + 27, "raw_confidence": c}
-                elif current_note["pitch"] != midi_pitch: # New note pitch
-                    note_duration = t - current_note["start_time"]
-                    if note_duration * 1000 >= min_note_duration_ms:
-                        midi_notes.append({
-                            "pitch": current_note["pitch"],
-                            "start_time": round(current_note["start_time"], 3),
-                            "duration": round(note_duration, 3),
-                            "velocity": current_note["velocity"]
-                        })
-                    current_note = {"pitch": midi_pitch, "start_time": t, "velocity": int(c * 100) + 27, "raw_confidence": c}
-                # else: continue current note (implicit)
-            elif current_note is not None: # End of a note due to low confidence or silence
-                note_duration = t - current_note["start_time"]
-                if note_duration * 1000 >= min_note_duration_ms:
-                    midi_notes.append({
-                        "pitch": current_note["pitch"],
-                        "start_time": round(current_note["start_time"], 3),
-                        "duration": round(note_duration, 3),
-                        "velocity": current_note["velocity"]
-                    })
-                current_note = None
-        
-        # Add the last note if it was still active
-        if current_note is not None:
-            note_duration = time[-1] - current_note["start_time"]
-            if note_duration * 1000 >= min_note_duration_ms:
-                 midi_notes.append({
-                    "pitch": current_note["pitch"],
-                    "start_time": round(current_note["start_time"], 3),
-                    "duration": round(note_duration, 3),
-                    "velocity": current_note["velocity"]
-                })
-
-        print(f"Converted to {len(midi_notes)} MIDI-like notes.")
+        midi_notes = _segment_notes(time, cents, confidence)
+
+        logger.debug("Converted to %d MIDI-like notes.", len(midi_notes))
 
         return {
             "filename": filename,
@@ -95,9 +185,7 @@ async def process_voice_to_midi(audio_content: bytes, filename: str) -> Dict[str
         }
 
     except Exception as e:
-        print(f"Error during CREPE processing or MIDI conversion: {str(e)}")
-        # import traceback
-        # traceback.print_exc()
+        logger.exception("Error during CREPE processing or MIDI conversion for %s", filename)
         return {
             "filename": filename,
             "status": "error",
@@ -0,0 +1,68 @@
+# backend/tests/test_billing_webhook.py
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import billing
+from app.core.config import Settings, get_settings
+
+WEBHOOK_PATH = "/billing/stripe-webhook/"
+WEBHOOK_SECRET = "whsec_test_secret"
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(billing.router, prefix="/billing")
+    app.dependency_overrides[get_settings] = lambda: Settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+    return TestClient(app)
+
+def _signed_event(event_type: str, data_object: dict, secret: str = WEBHOOK_SECRET) -> tuple[bytes, str]:
+    # Same scheme stripe.Webhook.construct_event verifies: HMAC-SHA256 over "<timestamp>.<payload>"
+    payload = json.dumps({
+        "id": "evt_test",
+        "object": "event",
+        "type": event_type,
+        "data": {"object": data_object},
+    }).encode()
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return payload, f"t={timestamp},v1={signature}"
+
+def test_checkout_completed_event_reaches_handler(caplog):
+    payload, signature = _signed_event("checkout.session.completed", {
+        "id": "cs_test",
+        "object": "checkout.session",
+        "client_reference_id": "user_1",
+        "customer": "cus_test",
+        "subscription": "sub_test",
+    })
+    with caplog.at_level(logging.INFO, logger=billing.logger.name):
+        response = _client().post(WEBHOOK_PATH, content=payload, headers={"Stripe-Signature": signature})
+    assert response.status_code == 200
+    assert response.json()["event_type"] == "checkout.session.completed"
+    assert "Checkout session completed for user user_1. Customer: cus_test, Subscription: sub_test" in caplog.text
+
+def test_subscription_event_reaches_handler(caplog):
+    payload, signature = _signed_event("customer.subscription.updated", {
+        "id": "sub_test",
+        "object": "subscription",
+        "status": "past_due",
+    })
+    with caplog.at_level(logging.INFO, logger=billing.logger.name):
+        response = _client().post(WEBHOOK_PATH, content=payload, headers={"Stripe-Signature": signature})
+    assert response.status_code == 200
+    assert "Subscription sub_test status updated to past_due." in caplog.text
+
+def test_unhandled_event_is_acknowledged():
+    payload, signature = _signed_event("customer.created", {"id": "cus_test", "object": "customer"})
+    response = _client().post(WEBHOOK_PATH, content=payload, headers={"Stripe-Signature": signature})
+    assert response.status_code == 200
+
+def test_bad_signature_is_rejected():
+    payload, signature = _signed_event("checkout.session.completed", {"id": "cs_test"}, secret="whsec_wrong")
+    response = _client().post(WEBHOOK_PATH, content=payload, headers={"Stripe-Signature": signature})
+    assert response.status_code == 400
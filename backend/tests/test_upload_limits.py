@@ -0,0 +1,63 @@
+# backend/tests/test_upload_limits.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_active_user
+from app.api.v1.endpoints import samples
+from app.core.upload_limits import UploadLimitMiddleware
+from app.schemas.user import User
+
+UPLOAD_PATH = "/samples/upload-sample/"
+BOUNDARY = "cowriter-test-boundary"
+MULTIPART_CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+def _multipart_body(payload: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="sample_file"; filename="kick.wav"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+# The limit is exactly the size of a body carrying a 4KB payload
+MAX_BYTES = len(_multipart_body(b"\0" * 4096))
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(samples.router, prefix="/samples")
+    app.dependency_overrides[get_current_active_user] = lambda: User(id="user_1", email="user@example.com")
+    app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_BYTES, paths=[UPLOAD_PATH])
+    return TestClient(app)
+
+def _chunked(body: bytes, chunk_size: int = 1024):
+    # A generator body makes httpx send Transfer-Encoding: chunked without a Content-Length
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+def test_chunked_upload_at_limit_reaches_endpoint():
+    body = _multipart_body(b"\0" * 4096)
+    assert len(body) == MAX_BYTES
+    response = _client().post(UPLOAD_PATH, content=_chunked(body), headers={"Content-Type": MULTIPART_CONTENT_TYPE})
+    assert response.status_code == 200
+    assert response.json()["size_bytes"] == 4096
+
+def test_chunked_upload_over_limit_is_rejected():
+    body = _multipart_body(b"\0" * 4097)
+    response = _client().post(UPLOAD_PATH, content=_chunked(body), headers={"Content-Type": MULTIPART_CONTENT_TYPE})
+    assert response.status_code == 413
+
+def test_content_length_over_limit_is_rejected():
+    body = _multipart_body(b"\0" * 4097)
+    response = _client().post(UPLOAD_PATH, content=body, headers={"Content-Type": MULTIPART_CONTENT_TYPE})
+    assert response.status_code == 413
+
+def test_non_multipart_upload_is_rejected():
+    response = _client().post(UPLOAD_PATH, content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 415
+
+def test_invalid_content_length_is_rejected():
+    response = _client().post(
+        UPLOAD_PATH,
+        content=_multipart_body(b"\0" * 16),
+        headers={"Content-Type": MULTIPART_CONTENT_TYPE, "Content-Length": "not-a-number"},
+    )
+    assert response.status_code == 400
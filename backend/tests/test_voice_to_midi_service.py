@@ -0,0 +1,25 @@
+# backend/tests/test_voice_to_midi_service.py
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services.voice_to_midi_service import TARGET_SAMPLE_RATE, _decode_audio
+
+def _sine(channels: int) -> np.ndarray:
+    t = np.arange(TARGET_SAMPLE_RATE) / TARGET_SAMPLE_RATE
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    return tone if channels == 1 else np.stack([tone] * channels, axis=1)
+
+@pytest.mark.parametrize("subtype", ["PCM_16", "PCM_24", "FLOAT", "DOUBLE"])
+@pytest.mark.parametrize("channels", [1, 2])
+def test_decode_audio_keeps_signal_for_every_wav_subtype(subtype, channels):
+    wav = io.BytesIO()
+    sf.write(wav, _sine(channels), TARGET_SAMPLE_RATE, format="WAV", subtype=subtype)
+
+    y, sr = _decode_audio(wav)
+
+    assert sr == TARGET_SAMPLE_RATE
+    assert y.dtype == np.float32 and y.shape == (TARGET_SAMPLE_RATE,)
+    np.testing.assert_allclose(y, _sine(1), atol=1e-4)